@@ -10,6 +10,8 @@ REDIRECT_URI = os.getenv("COGNITO_REDIRECT_URI", "http://localhost:8000/auth/cal
 LOGOUT_REDIRECT_URI = os.getenv("COGNITO_LOGOUT_REDIRECT_URI", "http://localhost:8000/")
 
 STATE_SECRET = os.getenv("STATE_SECRET", "CHANGE_ME")
+# Signs the session cookie, which is the only login credential: no default
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
 
 ISSUER = f"https://cognito-idp.{AWS_REGION}.amazonaws.com/{USER_POOL_ID}"
 JWKS_URL = f"{ISSUER}/.well-known/jwks.json"
@@ -1,41 +1,54 @@
 from typing import Dict, Any
+import functools
 import time
+from fastapi.concurrency import run_in_threadpool
 from jwt import PyJWKClient, InvalidTokenError
 import jwt  # PyJWT
 
 from .cognito_config import JWKS_URL, ISSUER
 
-_jwk_client = None
-_last_fetch = 0
-_cache_ttl = 60 * 10  # 10 minutes
+_LEEWAY = 120  # allow 2 minutes clock skew
 
+# Parsed signing keys by `kid`; Cognito rotates rarely, so this stays tiny
+_kid_cache: Dict[str, Any] = {}
+
+@functools.lru_cache(maxsize=1)
 def _get_jwk_client() -> PyJWKClient:
-    global _jwk_client, _last_fetch
-    now = time.time()
-    if _jwk_client is None or (now - _last_fetch) > _cache_ttl:
-        _jwk_client = PyJWKClient(JWKS_URL)
-        _last_fetch = now
-    return _jwk_client
+    # One process-wide client: PyJWT keeps the JWKS and signing keys cached
+    # and re-fetches by itself when it sees an unknown `kid` (key rotation).
+    return PyJWKClient(JWKS_URL, cache_keys=True, max_cached_keys=16, lifespan=3600)
+
+def _get_signing_key(token: str) -> Any:
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = _kid_cache.get(kid) if kid else None
+    if key is None:
+        key = _get_jwk_client().get_signing_key(kid).key
+        _kid_cache[kid] = key
+    return key
 
 def verify_jwt(token: str, audience: str) -> Dict[str, Any]:
+    # Only the login callback verifies Cognito tokens, each one fresh, so
+    # there is nothing to gain from caching verified claims here
     try:
-        signing_key = _get_jwk_client().get_signing_key_from_jwt(token).key
-        claims = jwt.decode(
+        # Reject expired tokens from the unverified payload (base64 + JSON)
+        # before paying for the key lookup and RS256 verify
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        if isinstance(exp, (int, float)) and exp < time.time() - _LEEWAY:
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+        signing_key = _get_signing_key(token)
+        return jwt.decode(
             token,
             signing_key,
             algorithms=["RS256"],
             audience=audience,
             issuer=ISSUER,
-            options={
-                "verify_signature": True,
-                "verify_exp": True,
-                "verify_iat": True,   
-                "verify_nbf": True,
-                "verify_iss": True,
-                "verify_aud": True,
-            },
-            leeway=120,  # <-- allow 2 minutes clock skew
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+            leeway=_LEEWAY,
         )
-        return claims
     except InvalidTokenError as e:
         raise
+
+async def averify_jwt(token: str, audience: str) -> Dict[str, Any]:
+    """verify_jwt for async handlers: runs the RSA work off the event loop."""
+    return await run_in_threadpool(verify_jwt, token, audience)
@@ -0,0 +1,85 @@
+from typing import Dict, Any, Optional
+import hashlib
+import threading
+import time
+from cachetools import TTLCache
+import jwt  # PyJWT
+from fastapi import HTTPException, Request
+
+from .cognito_config import SESSION_SECRET
+
+# Anyone who knows this key can mint a session for any user, so refuse to
+# start with a missing, placeholder or short one
+if not SESSION_SECRET or SESSION_SECRET == "CHANGE_ME":
+    raise RuntimeError("SESSION_SECRET env is not set")
+if len(SESSION_SECRET) < 32:
+    raise RuntimeError("SESSION_SECRET must be at least 32 characters")
+
+SESSION_COOKIE = "session"
+SESSION_TTL = 60 * 60  # 1 hour, same as the Cognito ID token
+# Required on decode so no other HS256 token under this key passes as a session
+SESSION_ISSUER = "findocgpt"
+SESSION_AUDIENCE = "findocgpt-session"
+
+# Only what the views and APIs read; everything else stays in the ID token
+_SESSION_CLAIMS = ("sub", "email", "email_verified", "name", "given_name")
+
+# Decoded sessions keyed by a hash of the cookie. Entries are served until
+# 30 s before `exp`; the TTL only bounds how long an idle entry lingers.
+_SESSION_CACHE_TTL = 300
+_SESSION_MIN_REMAINING = 30
+_session_cache = TTLCache(maxsize=4096, ttl=_SESSION_CACHE_TTL)
+_session_lock = threading.Lock()
+
+def issue_session(id_claims: Dict[str, Any], ttl: int = SESSION_TTL) -> str:
+    """Mint our own HS256 session token from already-verified ID token claims."""
+    now = int(time.time())
+    payload = {k: id_claims[k] for k in _SESSION_CLAIMS if k in id_claims}
+    payload["iss"] = SESSION_ISSUER
+    payload["aud"] = SESSION_AUDIENCE
+    payload["iat"] = now
+    payload["exp"] = now + ttl
+    return jwt.encode(payload, SESSION_SECRET, algorithm="HS256")
+
+def verify_session(token: str) -> Dict[str, Any]:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    with _session_lock:
+        hit = _session_cache.get(key)
+    if hit is not None and now < hit["exp"] - _SESSION_MIN_REMAINING:
+        return hit
+    # HMAC check instead of RS256: no JWKS, no modexp on every request
+    claims = jwt.decode(
+        token,
+        SESSION_SECRET,
+        algorithms=["HS256"],
+        issuer=SESSION_ISSUER,
+        audience=SESSION_AUDIENCE,
+        options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+    )
+    if now < claims["exp"] - _SESSION_MIN_REMAINING:
+        with _session_lock:
+            _session_cache[key] = claims
+    return claims
+
+# ---------- FastAPI dependencies ----------
+# Use these via Depends(): FastAPI caches a dependency's result for the
+# whole request, so the cookie is decoded once however many deps need it.
+
+async def current_claims(request: Request) -> Dict[str, Any]:
+    token = request.cookies.get(SESSION_COOKIE)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        return verify_session(token)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Token invalid: {e}")
+
+async def optional_claims(request: Request) -> Optional[Dict[str, Any]]:
+    token = request.cookies.get(SESSION_COOKIE)
+    if not token:
+        return None
+    try:
+        return verify_session(token)
+    except Exception:
+        return None
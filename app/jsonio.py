@@ -0,0 +1,48 @@
+from decimal import Decimal
+from typing import Any, Callable, Coroutine
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+
+
+def _default(obj: Any) -> Any:
+    # DynamoDB hands numbers back as Decimal and string/number sets as set;
+    # datetime, date and UUID are serialized by orjson natively
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also understands DynamoDB values. Return it directly
+    from list endpoints: FastAPI then skips jsonable_encoder's per-value walk.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+class ORJSONRequest(Request):
+    async def json(self) -> Any:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so FastAPI
+        # still turns malformed bodies into a 422
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    """Route class that parses JSON request bodies with orjson."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        original = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            return await original(ORJSONRequest(request.scope, request.receive))
+
+        return handler
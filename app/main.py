@@ -1,26 +1,29 @@
-from . import config 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
+from fastapi.responses import ORJSONResponse
+
 from . import config
+from .static_files import CachedStaticFiles, STATIC_DIR
 from .views.web import router as web_router
+from .routers.health import router as health_router
 from .routers.auth_cognito import router as cognito_router
 from .routers.runs import router as runs_router
 from .routers.chat import router as chat_router
+from .routers.ai_chat import router as ai_router
 
-app = FastAPI(title="FinDocGPT", version="1.0.0")
- 
-# Static files (CSS, images, JS)
-static_path = Path(__file__).resolve().parent / "static"
-app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app = FastAPI(title="FinDocGPT", version="1.0.0", default_response_class=ORJSONResponse)
 
+# Static files (CSS, images, JS)
+app.mount("/static", CachedStaticFiles(directory=str(STATIC_DIR), max_age=3600), name="static")
+app.mount("/uploads", CachedStaticFiles(directory="uploads", max_age=300), name="uploads")
 
 # Routers
-app.include_router(web_router, tags=["web"])
-app.include_router(cognito_router, tags=["auth"])
-app.include_router(runs_router, tags=["runs"])
-app.include_router(chat_router)
-
-from .routers.ai_chat import router as ai_router
-app.include_router(ai_router)
\ No newline at end of file
+ROUTERS = [
+    (web_router, {"tags": ["web"]}),
+    (health_router, {"prefix": "/api", "tags": ["health"]}),
+    (cognito_router, {"tags": ["auth"]}),
+    (runs_router, {"tags": ["runs"]}),
+    (chat_router, {}),
+    (ai_router, {}),
+]
+for r, kw in ROUTERS:
+    app.include_router(r, **kw)
@@ -1,19 +1,19 @@
 # app/routers/ai_chat.py
 from __future__ import annotations
 
-import datetime as dt
-from pathlib import Path
+import time
 from typing import Any, Dict, Optional, List
 
+import numpy as np
 from fastapi import APIRouter, Request, HTTPException, Query, Body
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
+from ..jsonio import ORJSONRoute
+from ..templates_env import templates
 from ..services.yahoo import summarize_basic, extract_first_ticker, normalize_ticker
 
 # ---- Router + templates ----------------------------------------------------
-router = APIRouter(tags=["ai"])
-templates = Jinja2Templates(directory=str(Path(__file__).resolve().parents[1] / "templates"))
+router = APIRouter(tags=["ai"], route_class=ORJSONRoute)
 
 # ---- Page ------------------------------------------------------------------
 @router.get("/ai", response_class=HTMLResponse)
@@ -95,27 +95,40 @@ async def ai_chat(payload: Dict[str, Any] = Body(...)):
     answer = f"{ticker}: {price_txt} ({chg_txt} today). Trend — {trend_line}. 52w range: {range_txt}."
 
     # ---- Build simple chart config for ai.html ------------------------------
-    pts_map = {}
-    for s in smp:
-        try:
-            ts = int(s["t"])
-            pts_map[ts] = float(s["close"])   # last value wins if duplicate ts
-        except Exception:
-            continue
-
-    pts = sorted(pts_map.items(), key=lambda x: x[0])  # [(ts, close), ...]
+    try:
+        ts_arr = np.fromiter((s["t"] for s in smp), dtype=np.int64, count=len(smp))
+        close_arr = np.fromiter((s["close"] for s in smp), dtype=np.float64, count=len(smp))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        # A malformed sample somewhere: drop just those rows, keep the rest
+        rows = []
+        for s in smp:
+            try:
+                rows.append((int(s["t"]), float(s["close"])))
+            except Exception:
+                continue
+        ts_arr = np.array([t for t, _ in rows], dtype=np.int64)
+        close_arr = np.array([c for _, c in rows], dtype=np.float64)
+
+    if ts_arr.size < 2 or bool((ts_arr[1:] > ts_arr[:-1]).all()):
+        uniq_ts, uniq_close = ts_arr, close_arr    # Yahoo already returns ordered, unique days
+    else:
+        # sort + dedup by timestamp; unique() on the reversed array keeps the last value per ts
+        uniq_ts, rev_idx = np.unique(ts_arr[::-1], return_index=True)
+        uniq_close = close_arr[::-1][rev_idx]
+
     MAX_POINTS = 30
-    if len(pts) > MAX_POINTS:
-        step = max(1, len(pts) // MAX_POINTS)
-        pts = pts[::step][:MAX_POINTS]
+    n = uniq_ts.size
+    idx = np.linspace(0, n - 1, min(MAX_POINTS, n), dtype=np.int64)
+    pts_ts = uniq_ts[idx]
+    pts_close = uniq_close[idx]
 
-    labels = [dt.datetime.fromtimestamp(ts).strftime("%b %d") for ts, _ in pts]
-    values = [v for _, v in pts]
+    labels = [time.strftime("%b %d", time.localtime(ts)) for ts in pts_ts.tolist()]
+    values = pts_close.tolist()
 
     charts = []
     if labels and values:
         # compute padded y-range so the frontend can fix the axis (prevents jitter)
-        y_min = min(values); y_max = max(values)
+        y_min = float(pts_close.min()); y_max = float(pts_close.max())
         pad = max(0.01, (y_max - y_min) * 0.05)
         y_min -= pad; y_max += pad
 
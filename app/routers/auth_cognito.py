@@ -12,7 +12,8 @@ from ..auth.cognito_config import (
     REDIRECT_URI, LOGOUT_REDIRECT_URI
 )
 from ..auth.cognito_config import STATE_SECRET
-from ..auth.cognito_verify import verify_jwt
+from ..auth.cognito_verify import averify_jwt
+from ..auth.session import SESSION_COOKIE, issue_session, current_claims
 from ..auth.cognito_config import CLIENT_ID as AUDIENCE
 
 router = APIRouter()
@@ -22,6 +23,8 @@ ID_COOKIE = "id_token"
 ACCESS_COOKIE = "access_token"
 COOKIE_MAX_AGE = 60 * 60  # 1 hour
 
+_SIGNER = TimestampSigner(STATE_SECRET)
+
 def set_cookie(resp: Response, key: str, value: str, max_age: int = COOKIE_MAX_AGE):
     resp.set_cookie(
         key,
@@ -37,10 +40,10 @@ def clear_cookie(resp: Response, key: str):
     resp.delete_cookie(key, path="/")
 
 def _sign_state(raw_state: str) -> str:
-    return TimestampSigner(STATE_SECRET).sign(raw_state).decode()
+    return _SIGNER.sign(raw_state).decode()
 
 def _unsign_state(signed_state: str, max_age: int = 600) -> str:
-    return TimestampSigner(STATE_SECRET).unsign(signed_state, max_age=max_age).decode()
+    return _SIGNER.unsign(signed_state, max_age=max_age).decode()
 
 @router.get("/auth/login")
 def login(force: bool = False):
@@ -100,11 +103,13 @@ async def callback(request: Request, code: Optional[str] = None, state: Optional
 
     # Verify ID token before setting
     try:
-        _ = verify_jwt(id_token, audience=AUDIENCE)
+        id_claims = await averify_jwt(id_token, audience=AUDIENCE)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid ID token: {e}")
 
     resp = RedirectResponse("/", status_code=status.HTTP_302_FOUND)
+    # Requests authenticate with our HS256 session cookie; the ID token is kept for logout only
+    set_cookie(resp, SESSION_COOKIE, issue_session(id_claims, ttl=COOKIE_MAX_AGE))
     set_cookie(resp, ID_COOKIE, id_token)
     set_cookie(resp, ACCESS_COOKIE, access_token)
     clear_cookie(resp, STATE_COOKIE)
@@ -118,23 +123,14 @@ def logout():
     }
     url = f"{LOGOUT_URL}?{urllib.parse.urlencode(params)}"
     resp = RedirectResponse(url, status_code=status.HTTP_302_FOUND)
+    clear_cookie(resp, SESSION_COOKIE)
     clear_cookie(resp, ID_COOKIE)
     clear_cookie(resp, ACCESS_COOKIE)
     clear_cookie(resp, STATE_COOKIE)
     return resp
 
-def get_current_user_from_cookie(request: Request):
-    token = request.cookies.get(ID_COOKIE)
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    try:
-        claims = verify_jwt(token, audience=AUDIENCE)
-        return claims
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=f"Token invalid: {e}")
-
 @router.get("/api/me")
-def me(claims: dict = Depends(get_current_user_from_cookie)):
+def me(claims: dict = Depends(current_claims)):
     return {
         "sub": claims.get("sub"),
         "email": claims.get("email"),
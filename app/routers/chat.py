@@ -1,13 +1,12 @@
 from typing import Optional, Any, Dict
 
-from fastapi import APIRouter, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Request, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from pathlib import Path
 
-from ..auth.cognito_verify import verify_jwt  # type: ignore
-from ..auth.cognito_config import CLIENT_ID as AUDIENCE  # type: ignore
+from ..jsonio import FastJSONResponse, ORJSONRoute
+from ..templates_env import templates
+from ..auth.session import SESSION_COOKIE, verify_session, current_claims, optional_claims  # type: ignore
 
 # Social/Dynamo helpers
 from ..services.social import (
@@ -18,37 +17,24 @@ from ..services.social import (
 # Realtime DM manager (simple in-memory WebSocket hub)
 from ..services.realtime import dm_manager  # provides connect(), disconnect(), broadcast()
 
-router = APIRouter(tags=["chat"])
-
-templates = Jinja2Templates(
-    directory=str(Path(__file__).resolve().parents[1] / "templates")
-)
-
-
-# ---------- Auth helper ----------
-def claims(request: Request) -> Dict[str, Any]:
-    token = request.cookies.get("id_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    return verify_jwt(token, audience=AUDIENCE)
+router = APIRouter(tags=["chat"], route_class=ORJSONRoute)
 
 
 # ---------- Page: Social Feed ----------
 @router.get("/social", response_class=HTMLResponse)
-def social_page(request: Request):
+def social_page(request: Request, c: Optional[Dict[str, Any]] = Depends(optional_claims)):
     """
     Renders the /social page (social feed).
     """
-    email = given = my_sub = None
-    try:
-        c = claims(request)
-        email = c.get("email")
-        given = c.get("given_name")
-        my_sub = c.get("sub")
-        if my_sub:
+    c = c or {}
+    email = c.get("email")
+    given = c.get("given_name")
+    my_sub = c.get("sub")
+    if my_sub:
+        try:
             upsert_profile(my_sub, email or "", given or "")
-    except Exception:
-        pass
+        except Exception:
+            pass
 
     return templates.TemplateResponse(
         "social.html",
@@ -63,20 +49,19 @@ def social_page(request: Request):
 
 # ---------- Page: People (DMs) ----------
 @router.get("/people", response_class=HTMLResponse)
-def people_page(request: Request):
+def people_page(request: Request, c: Optional[Dict[str, Any]] = Depends(optional_claims)):
     """
     Renders the /people page (DMs only).
     """
-    email = given = my_sub = None
-    try:
-        c = claims(request)
-        email = c.get("email")
-        given = c.get("given_name")
-        my_sub = c.get("sub")
-        if my_sub:
+    c = c or {}
+    email = c.get("email")
+    given = c.get("given_name")
+    my_sub = c.get("sub")
+    if my_sub:
+        try:
             upsert_profile(my_sub, email or "", given or "")
-    except Exception:
-        pass
+        except Exception:
+            pass
 
     return templates.TemplateResponse(
         "people.html",
@@ -103,8 +88,7 @@ class RepostIn(BaseModel):
 
 
 @router.post("/api/social/post")
-def api_post(data: PostIn, request: Request):
-    c = claims(request)
+def api_post(data: PostIn, c: Dict[str, Any] = Depends(current_claims)):
     txt = (data.text or "").strip()
     if not txt:
         raise HTTPException(status_code=400, detail="Text required")
@@ -116,38 +100,35 @@ def api_post(data: PostIn, request: Request):
 
 @router.get("/api/social/feed")
 def api_feed(limit: int = 20, cursor: Optional[str] = None):
-    return list_feed(limit=limit, cursor=cursor)
+    return FastJSONResponse(list_feed(limit=limit, cursor=cursor))
 
 
 @router.post("/api/social/like")
-def api_like(data: LikeIn, request: Request):
-    c = claims(request)
+def api_like(data: LikeIn, c: Dict[str, Any] = Depends(current_claims)):
     return toggle_like(data.post_id, c["sub"])
 
 
 @router.post("/api/social/repost")
-def api_repost(data: RepostIn, request: Request):
-    c = claims(request)
+def api_repost(data: RepostIn, c: Dict[str, Any] = Depends(current_claims)):
     return repost(data.post_id, c["sub"])
 
 
 # ---------- Users / Connections ----------
 @router.get("/api/chat/users")
-def api_users(q: str, limit: int = 8):
-    return {"items": search_users_local(q, limit=limit)}
+def api_users(q: str, limit: int = 8, cursor: Optional[str] = None):
+    return FastJSONResponse(search_users_local(q, limit=limit, cursor=cursor))
 
 
 @router.get("/api/chat/connections")
-def api_connections(request: Request):
-    c = claims(request)
-    return {"conversations": list_dm_conversations(c["sub"])}
+def api_connections(cursor: Optional[str] = None, c: Dict[str, Any] = Depends(current_claims)):
+    res = list_dm_conversations(c["sub"], cursor=cursor)
+    return FastJSONResponse({"conversations": res["items"], "next": res["next"]})
 
 
 @router.post("/api/chat/connect")
-def api_connect(target_sub: str, request: Request):
+def api_connect(target_sub: str, c: Dict[str, Any] = Depends(current_claims)):
     # For simplicity, connection creation lives in services.social.connect_users
     from ..services.social import connect_users  # lazy import to avoid cycle
-    c = claims(request)
     return connect_users(c["sub"], target_sub)
 
 
@@ -158,11 +139,10 @@ class DMIn(BaseModel):
 
 
 @router.post("/api/chat/dm")
-async def api_dm(data: DMIn, request: Request):
+async def api_dm(data: DMIn, c: Dict[str, Any] = Depends(current_claims)):
     """
     Create a DM (persists to DynamoDB) and push it to both participants via WebSocket.
     """
-    c = claims(request)
     res = send_dm(c["sub"], data.to_sub, data.text)
     # Broadcast in real-time to the conversation room
     await dm_manager.broadcast(c["sub"], data.to_sub, {"type": "dm", "item": res["msg"]})
@@ -170,9 +150,9 @@ async def api_dm(data: DMIn, request: Request):
 
 
 @router.get("/api/chat/dm")
-def api_dm_list(with_sub: str, request: Request, limit: int = 50):
-    c = claims(request)
-    return {"items": list_dm(c["sub"], with_sub, limit=limit)}
+def api_dm_list(with_sub: str, limit: int = 50, cursor: Optional[str] = None,
+                c: Dict[str, Any] = Depends(current_claims)):
+    return FastJSONResponse(list_dm(c["sub"], with_sub, limit=limit, cursor=cursor))
 
 
 # ---------- WebSocket for realtime DMs ----------
@@ -183,12 +163,12 @@ async def ws_dm(websocket: WebSocket, peer_sub: str):
     push updates when either participant sends a message.
     """
     # Authenticate from cookie
-    token = websocket.cookies.get("id_token")
+    token = websocket.cookies.get(SESSION_COOKIE)
     if not token:
         await websocket.close(code=4401)
         return
     try:
-        c = verify_jwt(token, audience=AUDIENCE)
+        c = verify_session(token)
     except Exception:
         await websocket.close(code=4403)
         return
@@ -0,0 +1,12 @@
+from botocore.config import Config
+
+# One client config for every DynamoDB resource on the table, so runs and
+# social writes behave the same during an outage. Pool sized above the social
+# fan-out pool (16 workers) plus request threads; short timeouts fail fast.
+BOTO_CFG = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
+)
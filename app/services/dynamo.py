@@ -1,17 +1,27 @@
 import os, time, uuid
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 import boto3
 from boto3.dynamodb.conditions import Key
 
+from .boto_config import BOTO_CFG
+
 REGION = os.getenv("AWS_REGION", "eu-north-1")
 TABLE_NAME = os.getenv("DDB_TABLE")
 
 if not TABLE_NAME:
     raise RuntimeError("DDB_TABLE env is not set")
 
-_dynamo = boto3.resource("dynamodb", region_name=REGION)
+_dynamo = boto3.resource("dynamodb", region_name=REGION, config=BOTO_CFG)
 _table = _dynamo.Table(TABLE_NAME)
 
+@lru_cache(maxsize=1024)
+def _pk_expr(sub: str):
+    # Condition objects are immutable once built, so one per user can be shared
+    return Key("PK").eq(f"USER#{sub}")
+
+_RUN_SK = Key("SK").begins_with("RUN#")
+
 def _now_iso() -> str:
     return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
 
@@ -41,7 +51,7 @@ def create_run(sub: str, run_type: str, payload: Dict[str, Any] | None = None) -
 
 def list_recent_runs(sub: str, limit: int = 10) -> List[Dict[str, Any]]:
     resp = _table.query(
-        KeyConditionExpression=Key("PK").eq(f"USER#{sub}") & Key("SK").begins_with("RUN#"),
+        KeyConditionExpression=_pk_expr(sub) & _RUN_SK,
         ScanIndexForward=False,
         Limit=limit,
     )
@@ -50,12 +60,26 @@ def list_recent_runs(sub: str, limit: int = 10) -> List[Dict[str, Any]]:
 def list_today_runs(sub: str, limit: int = 20) -> List[Dict[str, Any]]:
     today_prefix = time.strftime("RUN#%Y-%m-%d", time.gmtime())
     resp = _table.query(
-        KeyConditionExpression=Key("PK").eq(f"USER#{sub}") & Key("SK").begins_with(today_prefix),
+        KeyConditionExpression=_pk_expr(sub) & Key("SK").begins_with(today_prefix),
         ScanIndexForward=False,
         Limit=limit,
     )
     return resp.get("Items", [])
 
+def count_today_runs(sub: str) -> int:
+    today_prefix = time.strftime("RUN#%Y-%m-%d", time.gmtime())
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": _pk_expr(sub) & Key("SK").begins_with(today_prefix),
+        "Select": "COUNT",
+    }
+    count = 0
+    while True:
+        resp = _table.query(**kwargs)
+        count += resp.get("Count", 0)
+        if "LastEvaluatedKey" not in resp:
+            return count
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
 def bump_rate(sub: str, key: str, ttl_seconds: int = 3600) -> Dict[str, Any]:
     bucket = time.strftime("%Y%m%dT%H", time.gmtime())
     ttl = int(time.time()) + ttl_seconds
@@ -69,5 +93,4 @@ def bump_rate(sub: str, key: str, ttl_seconds: int = 3600) -> Dict[str, Any]:
     return resp.get("Attributes", {})
 
 def get_usage_today(sub: str) -> Dict[str, Any]:
-    items = list_today_runs(sub, limit=100)
-    return {"runs_today": len(items)}
+    return {"runs_today": count_today_runs(sub)}
@@ -1,36 +1,76 @@
-from collections import defaultdict
-from typing import Dict, Set
+import asyncio
+from typing import Dict, Tuple
 from fastapi import WebSocket
 
+OUTBOX_SIZE = 64  # queued messages per socket before we drop it as a slow consumer
+_CLOSE = object()  # outbox sentinel: the writer closes its socket and exits
+
 def convo_id(a: str, b: str) -> str:
-    return "|".join(sorted([a, b]))
+    return f"{a}|{b}" if a < b else f"{b}|{a}"
 
 class DMManager:
     def __init__(self):
-        self.rooms: Dict[str, Set[WebSocket]] = defaultdict(set)
+        # room id -> ((socket, outbound queue), ...). Tuples are rebuilt on
+        # connect/disconnect (copy-on-write) so broadcast iterates them as-is.
+        # All mutation happens on the event loop between awaits, so no lock.
+        self.rooms: Dict[str, Tuple[Tuple[WebSocket, asyncio.Queue], ...]] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
 
     async def connect(self, ws: WebSocket, me: str, peer: str):
         await ws.accept()
-        self.rooms[convo_id(me, peer)].add(ws)
+        rid = convo_id(me, peer)
+        q: asyncio.Queue = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self.rooms[rid] = self.rooms.get(rid, ()) + ((ws, q),)
+        self._writers[ws] = asyncio.create_task(self._writer(ws, rid, q))
 
     def disconnect(self, ws: WebSocket, me: str, peer: str):
-        rid = convo_id(me, peer)
+        self._drop(convo_id(me, peer), ws)
+
+    def _drop(self, rid: str, ws: WebSocket):
+        task = self._writers.pop(ws, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        self._leave(rid, ws)
+
+    def _leave(self, rid: str, ws: WebSocket):
         room = self.rooms.get(rid)
         if not room: return
-        room.discard(ws)
-        if not room:
+        room = tuple(m for m in room if m[0] is not ws)
+        if room:
+            self.rooms[rid] = room
+        else:
             self.rooms.pop(rid, None)
 
+    async def _writer(self, ws: WebSocket, rid: str, q: asyncio.Queue):
+        # One writer per socket, so a slow peer only delays its own messages
+        try:
+            while True:
+                payload = await q.get()
+                if payload is _CLOSE:
+                    await ws.close(code=1013)  # try again later
+                    break
+                await ws.send_json(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        self._drop(rid, ws)
+
     async def broadcast(self, me: str, peer: str, payload: dict):
+        # Never awaits socket I/O: the sender doesn't wait on any consumer
         rid = convo_id(me, peer)
-        room = list(self.rooms.get(rid, set()))
-        dead = []
-        for ws in room:
+        for ws, q in self.rooms.get(rid, ()):
             try:
-                await ws.send_json(payload)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.rooms[rid].discard(ws)
+                q.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._evict(rid, ws, q)
+
+    def _evict(self, rid: str, ws: WebSocket, q: asyncio.Queue):
+        # Slow consumer: stop routing to it, discard its backlog and let its
+        # own writer close it, so only that task ever sends on the socket
+        self._leave(rid, ws)
+        while not q.empty():
+            q.get_nowait()
+        q.put_nowait(_CLOSE)
 
 dm_manager = DMManager()
@@ -1,19 +1,94 @@
-import os, time, uuid
-from typing import Any, Dict, List, Optional
+import os, time, uuid, base64, binascii, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 import boto3
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from cachetools import LRUCache
+
+from .boto_config import BOTO_CFG
 
 REGION = os.getenv("AWS_REGION", "eu-north-1")
 TABLE_NAME = os.getenv("DDB_TABLE")
 if not TABLE_NAME:
     raise RuntimeError("DDB_TABLE env is not set")
 
-dynamo = boto3.resource("dynamodb", region_name=REGION)
+# boto3 clients are thread-safe and `table` is only used for requests here,
+# so both are shared across threads
+dynamo = boto3.resource("dynamodb", region_name=REGION, config=BOTO_CFG)
 table = dynamo.Table(TABLE_NAME)
 
+# Fan-out pool for independent per-item queries (boto3 resources are shared safely for reads)
+_QUERY_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ddb-query")
+
+# Prefix search over profiles. The table needs a GSI (default name GSI1) with
+# partition key GSI1PK and sort key GSI1SK (both strings), projecting email and given_name.
+USER_SEARCH_INDEX = os.getenv("DDB_USER_SEARCH_INDEX", "GSI1")
+
+BATCH_GET_MAX = 100  # DynamoDB BatchGetItem key limit
+BATCH_GET_ATTEMPTS = 5  # calls per chunk incl. UnprocessedKeys retries, like the botocore budget
+
+# (epoch second, formatted) swapped as one tuple, so threads never see a torn pair
+_now_cache = (-1, "")
+
 def _now_iso() -> str:
-    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+    # Timestamps have 1 s resolution: format once per second, reuse otherwise
+    global _now_cache
+    t = int(time.time())
+    sec, text = _now_cache
+    if sec != t:
+        text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t))
+        _now_cache = (t, text)
+    return text
+
+def _transact(*ops: Dict[str, Any]) -> None:
+    """
+    Write several items in one atomic TransactWriteItems call. Each op is
+    {"Put": {...}} / {"Update": {...}} / {"Delete": {...}} without TableName.
+    The resource's client marshals plain Python values the same way Table does.
+    Conditional failures raise ClientError(TransactionCanceledException) with
+    per-op reasons in e.response["CancellationReasons"].
+    """
+    items = []
+    for op in ops:
+        (kind, body), = op.items()
+        items.append({kind: {"TableName": TABLE_NAME, **body}})
+    dynamo.meta.client.transact_write_items(TransactItems=items)
+
+# ---------- PAGINATION ----------
+# List queries project only the attributes callers render; LastEvaluatedKey
+# always carries the key attributes regardless of the projection.
+# Cursors are the query's LastEvaluatedKey, base64(PK + "\x00" + SK), handed to
+# the client and sent back as-is. Keys can contain "|" (DM#a|b), hence no plain join.
+# Index queries also carry the index keys, so pass key_attrs for those.
+
+_TABLE_KEYS = ("PK", "SK")
+_SEARCH_KEYS = ("PK", "SK", "GSI1PK", "GSI1SK")
+
+def _encode_cursor(values: Tuple[str, ...]) -> str:
+    return base64.urlsafe_b64encode("\x00".join(values).encode()).decode()
+
+def _decode_cursor(cursor: Optional[str], size: int) -> Optional[Tuple[str, ...]]:
+    if not cursor:
+        return None
+    try:
+        values = tuple(base64.urlsafe_b64decode(cursor.encode()).decode().split("\x00"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None  # bad cursor -> first page
+    return values if len(values) == size else None
+
+def _apply_cursor(kwargs: Dict[str, Any], cursor: Optional[str],
+                  key_attrs: Tuple[str, ...] = _TABLE_KEYS) -> Dict[str, Any]:
+    values = _decode_cursor(cursor, len(key_attrs))
+    if values:
+        kwargs["ExclusiveStartKey"] = dict(zip(key_attrs, values))
+    return kwargs
+
+def _next_cursor(resp: Dict[str, Any], key_attrs: Tuple[str, ...] = _TABLE_KEYS) -> Optional[str]:
+    lek = resp.get("LastEvaluatedKey")
+    if not lek:
+        return None
+    return _encode_cursor(tuple(lek[k] for k in key_attrs))
 
 # ---------- FEED POSTS ----------
 
@@ -33,63 +108,99 @@ def create_post(author_sub: str, author_name: str, text: str) -> Dict[str, Any]:
         "created_at": ts,
         "type": "post"
     }
-    table.put_item(Item=item)
-    # pointer under user (optional)
-    table.put_item(Item={
-        "PK": f"USER#{author_sub}", "SK": f"POST#{ts}#{post_id}",
-        "ref_pk": feed_pk, "ref_sk": feed_sk, "type": "user_post"
-    })
-    # mapping for convenience
-    table.put_item(Item={
-        "PK": f"POST#{post_id}", "SK": "MAP#FEED", "feed_pk": feed_pk, "feed_sk": feed_sk
-    })
+    _transact(
+        {"Put": {"Item": item}},
+        # pointer under user (optional)
+        {"Put": {"Item": {
+            "PK": f"USER#{author_sub}", "SK": f"POST#{ts}#{post_id}",
+            "ref_pk": feed_pk, "ref_sk": feed_sk, "type": "user_post"
+        }}},
+        # mapping for convenience
+        {"Put": {"Item": {
+            "PK": f"POST#{post_id}", "SK": "MAP#FEED", "feed_pk": feed_pk, "feed_sk": feed_sk
+        }}},
+    )
     return item
 
 def list_feed(limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
-    kwargs = {
+    kwargs = _apply_cursor({
         "KeyConditionExpression": Key("PK").eq("APP#FEED") & Key("SK").begins_with("POST#"),
-        "ScanIndexForward": False, "Limit": limit
-    }
-    if cursor:
-        try:
-            pk, sk = cursor.split("|", 1)
-            kwargs["ExclusiveStartKey"] = {"PK": pk, "SK": sk}
-        except Exception:
-            pass
+        "ScanIndexForward": False, "Limit": limit,
+        "ProjectionExpression": "post_id, author_sub, author_name, #t, like_count, repost_count, created_at",
+        "ExpressionAttributeNames": {"#t": "text"},
+    }, cursor)
     resp = table.query(**kwargs)
-    items = resp.get("Items", [])
-    next_cursor = None
-    if "LastEvaluatedKey" in resp:
-        lek = resp["LastEvaluatedKey"]
-        next_cursor = f"{lek['PK']}|{lek['SK']}"
-    return {"items": items, "next": next_cursor}
+    return {"items": resp.get("Items", []), "next": _next_cursor(resp)}
+
+# POST#<id>/MAP#FEED never changes once written, so hits are kept for the process
+_FEED_KEY_CACHE: LRUCache = LRUCache(maxsize=4096)
+_FEED_KEY_LOCK = threading.Lock()
 
 def _get_feed_key_from_post(post_id: str) -> Optional[Dict[str, str]]:
+    with _FEED_KEY_LOCK:
+        hit = _FEED_KEY_CACHE.get(post_id)
+    if hit is not None:
+        return hit
     resp = table.get_item(Key={"PK": f"POST#{post_id}", "SK": "MAP#FEED"})
     m = resp.get("Item")
-    if not m: return None
-    return {"PK": m["feed_pk"], "SK": m["feed_sk"]}
+    if not m: return None  # misses aren't cached: the post may not be written yet
+    feed_key = {"PK": m["feed_pk"], "SK": m["feed_sk"]}
+    with _FEED_KEY_LOCK:
+        _FEED_KEY_CACHE[post_id] = feed_key
+    return feed_key
+
+def _condition_failed(e: ClientError) -> bool:
+    code = e.response["Error"]["Code"]
+    if code == "ConditionalCheckFailedException":
+        return True
+    if code == "TransactionCanceledException":
+        # The like Put/Delete is always the first op
+        reasons = e.response.get("CancellationReasons") or [{}]
+        return reasons[0].get("Code") == "ConditionalCheckFailed"
+    return False
 
 def toggle_like(post_id: str, user_sub: str) -> Dict[str, Any]:
     like_key = {"PK": f"POST#{post_id}", "SK": f"LIKE#{user_sub}"}
+    feed_key = _get_feed_key_from_post(post_id)
+    if not feed_key:
+        # No feed item to count on: just flip the LIKE marker
+        try:
+            table.put_item(Item={**like_key, "ts": _now_iso()}, ConditionExpression="attribute_not_exists(PK)")
+            return {"liked": True}
+        except ClientError as e:
+            if not _condition_failed(e): raise
+        table.delete_item(Key=like_key)
+        return {"liked": False}
+
+    def counter(d: int) -> Dict[str, Any]:
+        return {"Update": {
+            "Key": feed_key,
+            "UpdateExpression": "ADD like_count :d",
+            "ExpressionAttributeValues": {":d": d},
+        }}
+
+    # Like marker and counter move together in one call; an existing like
+    # cancels the transaction, which means this toggle is an unlike.
     try:
-        table.put_item(Item={**like_key, "ts": _now_iso()}, ConditionExpression="attribute_not_exists(PK)")
-        liked = True
+        _transact(
+            {"Put": {
+                "Item": {**like_key, "ts": _now_iso(), "feed_pk": feed_key["PK"], "feed_sk": feed_key["SK"]},
+                "ConditionExpression": "attribute_not_exists(PK)",
+            }},
+            counter(1),
+        )
+        return {"liked": True}
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            table.delete_item(Key=like_key)
-            liked = False
-        else:
-            raise
-    feed_key = _get_feed_key_from_post(post_id)
-    if feed_key:
-        table.update_item(
-            Key=feed_key,
-            UpdateExpression="ADD like_count :d",
-            ExpressionAttributeValues={":d": 1 if liked else -1},
-            ReturnValues="UPDATED_NEW"
+        if not _condition_failed(e): raise
+    try:
+        _transact(
+            {"Delete": {"Key": like_key, "ConditionExpression": "attribute_exists(PK)"}},
+            counter(-1),
         )
-    return {"liked": liked}
+    except ClientError as e:
+        # Already removed by a concurrent unlike, which did the decrement
+        if not _condition_failed(e): raise
+    return {"liked": False}
 
 def repost(post_id: str, user_sub: str) -> Dict[str, Any]:
     feed_key = _get_feed_key_from_post(post_id)
@@ -108,51 +219,75 @@ def repost(post_id: str, user_sub: str) -> Dict[str, Any]:
 # ---------- USERS ----------
 
 def upsert_profile(sub: str, email: str, given_name: Optional[str] = None):
-    table.put_item(Item={
+    profile = {
         "PK": f"USER#{sub}",
         "SK": "PROFILE#MAIN",
         "email": email,
         "given_name": given_name or "",
         "updated_at": _now_iso(),
-        "type":"profile"
-    })
+        "type":"profile",
+        # search index keys (see USER_SEARCH_INDEX)
+        "GSI1PK": "PROFILE",
+        "GSI1SK": (given_name or email or sub).lower(),
+    }
+    email_key = {"PK": f"USER#{sub}", "SK": "PROFILE#EMAIL"}
+    if given_name and email:
+        # The main entry is indexed by name; this one keeps named users findable by email
+        _transact(
+            {"Put": {"Item": profile}},
+            {"Put": {"Item": {
+                **email_key, "email": email, "given_name": given_name, "type": "profile_email",
+                "GSI1PK": "PROFILE", "GSI1SK": email.lower(),
+            }}},
+        )
+    else:
+        # Main entry is already indexed by email (or sub); drop any stale email entry
+        _transact({"Put": {"Item": profile}}, {"Delete": {"Key": email_key}})
 
-def search_users_local(query: str, limit: int = 10) -> List[Dict[str, Any]]:
-    q = query.lower()
-    resp = table.scan(
-        FilterExpression=Attr("SK").eq("PROFILE#MAIN") & (
-            Attr("email").contains(query) | Attr("given_name").contains(query) | Attr("PK").contains(q)
-        ),
-        Limit=limit
-    )
+def search_users_local(query: str, limit: int = 10, cursor: Optional[str] = None) -> Dict[str, Any]:
+    q = (query or "").strip().lower()
+    if not q:
+        return {"items": [], "next": None}
+    # Prefix match on the search index: reads only matching profiles, not the whole table
+    resp = table.query(**_apply_cursor({
+        "IndexName": USER_SEARCH_INDEX,
+        "KeyConditionExpression": Key("GSI1PK").eq("PROFILE") & Key("GSI1SK").begins_with(q),
+        "Limit": limit,
+    }, cursor, _SEARCH_KEYS))
     items = resp.get("Items", [])
-    out = []
+    out = {}
     for it in items:
-        out.append({
-            "sub": it["PK"].split("#",1)[1],
+        sub = it["PK"].split("#",1)[1]
+        # a prefix can hit both the name and the email entry of one user
+        out.setdefault(sub, {
+            "sub": sub,
             "email": it.get("email",""),
             "given_name": it.get("given_name","")
         })
-    return out
+    return {"items": list(out.values()), "next": _next_cursor(resp, _SEARCH_KEYS)}
 
 # ---------- CONNECTIONS & DMs ----------
 
 def connect_users(a_sub: str, b_sub: str):
     now = _now_iso()
-    table.put_item(Item={"PK": f"USER#{a_sub}", "SK": f"CONN#{b_sub}", "created_at": now, "type":"conn"})
-    table.put_item(Item={"PK": f"USER#{b_sub}", "SK": f"CONN#{a_sub}", "created_at": now, "type":"conn"})
+    # a transaction may touch each item once, so connecting to yourself is one put
+    _transact(*(
+        {"Put": {"Item": {"PK": f"USER#{x}", "SK": f"CONN#{y}", "created_at": now, "type":"conn"}}}
+        for x, y in {a_sub: b_sub, b_sub: a_sub}.items()
+    ))
     return {"ok": True}
 
-def list_connections(sub: str, limit: int = 50) -> List[str]:
-    resp = table.query(
-        KeyConditionExpression=Key("PK").eq(f"USER#{sub}") & Key("SK").begins_with("CONN#"),
-        Limit=limit, ScanIndexForward=False
-    )
+def list_connections(sub: str, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    resp = table.query(**_apply_cursor({
+        "KeyConditionExpression": Key("PK").eq(f"USER#{sub}") & Key("SK").begins_with("CONN#"),
+        "Limit": limit, "ScanIndexForward": False,
+        "ProjectionExpression": "SK",
+    }, cursor))
     items = resp.get("Items", [])
-    return [i["SK"].split("#",1)[1] for i in items]
+    return {"items": [i["SK"].split("#",1)[1] for i in items], "next": _next_cursor(resp)}
 
 def _convo_id(a: str, b: str) -> str:
-    return "|".join(sorted([a,b]))
+    return f"{a}|{b}" if a < b else f"{b}|{a}"
 
 def send_dm(sender_sub: str, receiver_sub: str, text: str) -> Dict[str, Any]:
     cid = _convo_id(sender_sub, receiver_sub)
@@ -163,19 +298,29 @@ def send_dm(sender_sub: str, receiver_sub: str, text: str) -> Dict[str, Any]:
         "from": sender_sub, "to": receiver_sub, "text": text[:2000], "created_at": ts, "type":"dm",
         "msg_id": msg_id
     }
-    table.put_item(Item=msg)
-    table.put_item(Item={"PK": f"USER#{sender_sub}", "SK": f"DM#{cid}", "type":"dm_ptr", "updated_at": ts})
-    table.put_item(Item={"PK": f"USER#{receiver_sub}", "SK": f"DM#{cid}", "type":"dm_ptr", "updated_at": ts})
+    # Message + both pointers in one round-trip. Pointers carry the last
+    # message so listing conversations needs no per-room query.
+    _transact(
+        {"Put": {"Item": msg}},
+        *({"Update": {
+            "Key": {"PK": f"USER#{owner}", "SK": f"DM#{cid}"},
+            "UpdateExpression": "SET last_text=:t, last_at=:ts, updated_at=:ts, peer=:p, #ty=:ty",
+            "ExpressionAttributeNames": {"#ty": "type"},
+            "ExpressionAttributeValues": {":t": text[:160], ":ts": ts, ":p": peer, ":ty": "dm_ptr"},
+        }} for owner, peer in {sender_sub: receiver_sub, receiver_sub: sender_sub}.items()),
+    )
     return {"ok": True, "msg": {"from": sender_sub, "to": receiver_sub, "text": text, "created_at": ts, "msg_id": msg_id}}
 
 
-def list_dm(sub_a: str, sub_b: str, limit: int = 50) -> List[Dict[str, Any]]:
+def list_dm(sub_a: str, sub_b: str, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
     cid = _convo_id(sub_a, sub_b)
-    resp = table.query(
-        KeyConditionExpression=Key("PK").eq(f"DM#{cid}") & Key("SK").begins_with("MSG#"),
-        Limit=limit, ScanIndexForward=False
-    )
-    return resp.get("Items", [])
+    resp = table.query(**_apply_cursor({
+        "KeyConditionExpression": Key("PK").eq(f"DM#{cid}") & Key("SK").begins_with("MSG#"),
+        "Limit": limit, "ScanIndexForward": False,
+        "ProjectionExpression": "msg_id, #f, #to, #t, created_at",
+        "ExpressionAttributeNames": {"#f": "from", "#to": "to", "#t": "text"},
+    }, cursor))
+    return {"items": resp.get("Items", []), "next": _next_cursor(resp)}
 
 
 
@@ -186,33 +331,98 @@ def get_profile(sub: str):
     it = resp.get("Item") or {}
     return {"sub": sub, "email": it.get("email",""), "given_name": it.get("given_name","")}
 
-def list_dm_conversations(sub: str, limit: int = 20):
-    # Find my DM rooms (pointers live under USER#<sub> / SK begins DM#)
-    resp = table.query(
-        KeyConditionExpression=Key("PK").eq(f"USER#{sub}") & Key("SK").begins_with("DM#"),
-        Limit=limit, ScanIndexForward=False
+def get_profiles(subs: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Batch version of get_profile: one BatchGetItem per 100 subs instead of N GetItems."""
+    subs = list(dict.fromkeys(subs))  # BatchGetItem rejects duplicate keys
+    found: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(subs), BATCH_GET_MAX):
+        request = {TABLE_NAME: {
+            "Keys": [{"PK": f"USER#{s}", "SK": "PROFILE#MAIN"} for s in subs[i:i + BATCH_GET_MAX]],
+            "ProjectionExpression": "PK, email, given_name",
+        }}
+        delay = 0.05
+        for attempt in range(BATCH_GET_ATTEMPTS):
+            resp = dynamo.batch_get_item(RequestItems=request)
+            for it in resp.get("Responses", {}).get(TABLE_NAME, []):
+                found[it["PK"].split("#", 1)[1]] = it
+            request = resp.get("UnprocessedKeys")
+            if not request or attempt == BATCH_GET_ATTEMPTS - 1:
+                # still-unprocessed keys fall back to a bare profile below
+                break
+            # throttled keys come back unprocessed; retry them with backoff
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+    out = {}
+    for s in subs:
+        it = found.get(s) or {}
+        out[s] = {"sub": s, "email": it.get("email",""), "given_name": it.get("given_name","")}
+    return out
+
+def _latest_msg(cid: str) -> Optional[Dict[str, Any]]:
+    r = table.query(
+        KeyConditionExpression=Key("PK").eq(f"DM#{cid}") & Key("SK").begins_with("MSG#"),
+        Limit=1, ScanIndexForward=False,
+        ProjectionExpression="#t, created_at",
+        ExpressionAttributeNames={"#t": "text"},
     )
-    ptrs = resp.get("Items", [])
-    convs = []
-    for p in ptrs:
+    return (r.get("Items") or [None])[0]
+
+def _dm_pointers(sub: str) -> List[Dict[str, Any]]:
+    # All of my DM rooms (pointers live under USER#<sub> / SK begins DM#)
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("PK").eq(f"USER#{sub}") & Key("SK").begins_with("DM#"),
+        "ProjectionExpression": "SK, peer, last_text, last_at, updated_at",
+    }
+    items: List[Dict[str, Any]] = []
+    while True:
+        resp = table.query(**kwargs)
+        items.extend(resp.get("Items", []))
+        if not resp.get("LastEvaluatedKey"):
+            return items
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+def list_dm_conversations(sub: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    My conversations, newest message first. Pointer keys sort by room id, not
+    recency, so all (small, projected) pointers are read and ordered by
+    (last_at, room id); the cursor is that pair for the last row returned.
+    """
+    rooms = []
+    for p in _dm_pointers(sub):
         cid = p["SK"].split("#", 1)[1]  # "<a>|<b>"
-        a, b = cid.split("|", 1)
-        peer = b if a == sub else a
+        peer = p.get("peer")
+        if not peer:
+            a, b = cid.split("|", 1)
+            peer = b if a == sub else a
+        # legacy pointers have no last_at, but updated_at was set on every send
+        rooms.append(((p.get("last_at") or p.get("updated_at") or "", cid), p, peer))
+    rooms.sort(key=lambda r: r[0], reverse=True)
 
-        # newest message in this convo
-        r = table.query(
-            KeyConditionExpression=Key("PK").eq(f"DM#{cid}") & Key("SK").begins_with("MSG#"),
-            Limit=1, ScanIndexForward=False
-        )
-        last = (r.get("Items") or [None])[0]
-        prof = get_profile(peer)
+    after = _decode_cursor(cursor, 2)
+    if after:
+        rooms = [r for r in rooms if r[0] < after]
+    page = rooms[:limit]
+    nxt = _encode_cursor(page[-1][0]) if len(rooms) > limit else None
+
+    # Pointers written before last_text/last_at were denormalized still need
+    # the newest-message query; run those in parallel
+    legacy = [cid for (_, cid), p, _ in page if "last_at" not in p]
+    lasts = dict(zip(legacy, _QUERY_POOL.map(_latest_msg, legacy)))
+    profiles = get_profiles([peer for _, _, peer in page])
+
+    convs = []
+    for (_, cid), p, peer in page:
+        prof = profiles[peer]
+        if "last_at" in p:
+            last_text, last_at = p.get("last_text", ""), p["last_at"]
+        else:
+            last = lasts.get(cid)
+            last_text = last["text"] if last else ""
+            last_at = last["created_at"] if last else p.get("updated_at")
         convs.append({
             "peer_sub": peer,
             "peer_name": prof.get("given_name") or prof.get("email") or peer,
-            "last_text": last["text"] if last else "",
-            "last_at": last["created_at"] if last else p.get("updated_at")
+            "last_text": last_text,
+            "last_at": last_at
         })
-
-    # sort by last message time (desc)
-    convs.sort(key=lambda x: x.get("last_at") or "", reverse=True)
-    return convs
+    return {"items": convs, "next": nxt}
@@ -2,21 +2,68 @@
 from __future__ import annotations
 
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import datetime as dt
-from typing import Any, Dict, List, Optional, Set
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
 
+import ahocorasick
+import numpy as np
 import yfinance as yf
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 import pandas as pd
 import pytz
 
 EU_TZ = pytz.timezone("Europe/Berlin")
 
+# Quotes are delayed anyway; bursts of the same symbol within this window share one fetch
+_SUMMARY_CACHE: TTLCache = TTLCache(maxsize=512, ttl=30)
+_SUMMARY_LOCK = threading.Lock()
+
+# Quote, history and news are independent Yahoo calls; fetch them side by side
+_FETCH_POOL = ThreadPoolExecutor(max_workers=12, thread_name_prefix="yahoo")
+
+# Per-endpoint caches underneath: prices move in seconds, daily history and news much slower
+_QUOTE_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=15)
+_QUOTE_LOCK = threading.Lock()
+_HISTORY_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_HISTORY_LOCK = threading.Lock()
+_NEWS_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=600)
+_NEWS_LOCK = threading.Lock()
+
+def _cached_unless_empty(cache: TTLCache, lock: threading.Lock, is_empty: Callable[[Any], bool]):
+    """
+    cachetools.cached, except results for which is_empty() holds are returned
+    without being stored. yfinance reports network failures as empty data
+    rather than raising, so caching those would blank charts/news for a full TTL.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = hashkey(*args, **kwargs)
+            with lock:
+                hit = cache.get(key)
+            if hit is not None:
+                return hit
+            value = fn(*args, **kwargs)
+            if not is_empty(value):
+                with lock:
+                    cache[key] = value
+            return value
+        return wrapper
+    return decorator
+
+def _history_empty(payload: Dict[str, Any]) -> bool:
+    return not payload["samples"]
+
 # --------------------------------------------------------------------------------------
 # US-only controls
 # --------------------------------------------------------------------------------------
 
 # Yahoo fast_info.exchange codes commonly used for US listings
-_US_EXCHANGES: Set[str] = {
+_US_EXCHANGES: FrozenSet[str] = frozenset({
     "NMS",  # NASDAQ Global Select
     "NGM",  # NASDAQ Global Market
     "NCM",  # NASDAQ Capital Market
@@ -26,13 +73,14 @@ _US_EXCHANGES: Set[str] = {
     "PCX",  # NYSE Arca (ETFs)
     "BATS", # Cboe BZX
     "CBOE", # Cboe
-}
+})
 
 # Reject obvious non-US tickers via suffix
 _NON_US_SUFFIXES = (
     ".NS", ".BO", ".L", ".TO", ".HK", ".SS", ".SZ", ".T", ".AX", ".NZ",
     ".PA", ".DE", ".VI", ".SW", ".SA", ".MX", ".CO", ".MI", ".BR", ".OL",
 )
+_RE_NON_US = re.compile("(?:" + "|".join(re.escape(s) for s in _NON_US_SUFFIXES) + r")\Z")
 
 # --------------------------------------------------------------------------------------
 # Aliases: common names & variants -> US tickers
@@ -177,11 +225,39 @@ _ALIASES: Dict[str, str] = {
 }
 
 # Words we should ignore when trying to guess a ticker from plain English
-_STOPWORDS: Set[str] = {
+_STOPWORDS: FrozenSet[str] = frozenset({
     "PRICE", "TODAY", "NEWS", "TREND", "TRENDS", "AND", "OR", "THE", "A", "AN",
     "SHOW", "GIVE", "WHAT", "IS", "ARE", "FOR", "WITH", "OF", "ON", "TO", "IN",
     "PLEASE", "LATEST", "CURRENT", "UPDATE", "STOCK", "INFO",
-}
+})
+
+# Trend windows in trading days
+_TREND_KEYS = ("1d", "5d", "1mo", "3mo", "6mo", "1y")
+_TREND_OFFSETS = np.array([1, 5, 21, 63, 126, 252])
+
+# Patterns used per chat message, compiled once
+_RE_CLEAN = re.compile(r"[^A-Z0-9\.\-\s]+")
+_RE_WS = re.compile(r"\s+")
+_RE_VALID = re.compile(r"[A-Z0-9]{1,5}(?:-[A-Z]{1,2})?")
+_RE_DOLLAR_TICKER = re.compile(r"\$([A-Za-z0-9]{1,10}(?:[.\-][A-Za-z]{1,2})?)\b")
+_RE_CLASS_TICKER = re.compile(r"\b([A-Za-z0-9]{1,10}(?:[.\-][A-Za-z]{1,2}))\b")
+_RE_TOK = re.compile(r"[A-Za-z0-9]{1,6}")
+_SCAN_LIMIT = 4096  # chars of a message extract_first_ticker looks at
+_CACHE_MAX_LEN = 64  # longer messages skip the extract_first_ticker cache
+
+# Alias lookup: one Aho-Corasick pass over the message instead of tokenize + probe.
+# Only whole "words" count (runs of _WORD_CHARS, 2-20 long), as with the old tokenizer.
+_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-.&'")
+
+def _build_alias_automaton() -> ahocorasick.Automaton:
+    a = ahocorasick.Automaton()
+    for alias, ticker in _ALIASES.items():
+        if 2 <= len(alias) <= 20 and all(c in _WORD_CHARS for c in alias):
+            a.add_word(alias, (len(alias), ticker))
+    a.make_automaton()
+    return a
+
+_ALIAS_AUTOMATON = _build_alias_automaton()
 
 # --------------------------------------------------------------------------------------
 # Helpers
@@ -202,6 +278,7 @@ def _safe_pct(a: Optional[float], b: Optional[float]) -> Optional[float]:
 # Parsing & normalization
 # --------------------------------------------------------------------------------------
 
+@lru_cache(maxsize=4096)
 def normalize_ticker(text: str) -> str:
     """
     Clean user input to a Yahoo-style US ticker:
@@ -212,12 +289,11 @@ def normalize_ticker(text: str) -> str:
     """
     s = (text or "").strip().upper()
     s = s.replace("$", "")
-    s = re.sub(r"[^A-Z0-9\.\-\s]+", "", s).strip()
-    s = re.sub(r"\s+", "", s)
+    s = _RE_CLEAN.sub("", s).strip()
+    s = _RE_WS.sub("", s)
 
-    for suf in _NON_US_SUFFIXES:
-        if s.endswith(suf):
-            raise ValueError("Only US-listed symbols are supported.")
+    if _RE_NON_US.search(s):
+        raise ValueError("Only US-listed symbols are supported.")
 
     # Map common names/variants
     if s in _ALIASES:
@@ -228,7 +304,7 @@ def normalize_ticker(text: str) -> str:
         s = s.replace(".", "-")
 
     # Basic validation (1–5 core chars, optional -CLASS)
-    if not re.fullmatch(r"[A-Z0-9]{1,5}(?:-[A-Z]{1,2})?", s):
+    if not _RE_VALID.fullmatch(s):
         raise ValueError("Unsupported ticker format (US symbols only).")
 
     return s
@@ -239,41 +315,55 @@ def extract_first_ticker(message: str) -> Optional[str]:
     Precedence:
       1) $TICKER (e.g., $AAPL)
       2) Ticker with class (BRK.B / BRK-B)
-      3) Known alias word (APPLE, TESLA, etc.)
+      3) Known alias word (APPLE, TESLA, etc.) -> returned already mapped (AAPL, TSLA)
       4) Uppercase token that looks like a ticker and not a stopword
     """
-    msg = (message or "").strip()
-
+    # Only the head of a pasted blob is scanned; strip before the cache so
+    # "AAPL" and "AAPL " share one entry
+    msg = (message or "")[:_SCAN_LIMIT].strip()
+    # Short inputs ("apple", "$TSLA price") repeat; free-form sentences rarely
+    # do and would only fill the cache with large keys
+    if len(msg) <= _CACHE_MAX_LEN:
+        return _extract_first_ticker_cached(msg)
+    return _extract_first_ticker(msg)
+
+def _extract_first_ticker(msg: str) -> Optional[str]:
     # 1) $TICKER
-    m = re.search(r"\$([A-Za-z0-9]{1,10}(?:[.\-][A-Za-z]{1,2})?)\b", msg)
+    m = _RE_DOLLAR_TICKER.search(msg)
     if m:
         return m.group(1).upper()
 
     # 2) TICKER with dot/dash class
-    m = re.search(r"\b([A-Za-z0-9]{1,10}(?:[.\-][A-Za-z]{1,2}))\b", msg)
+    m = _RE_CLASS_TICKER.search(msg)
     if m:
         return m.group(1).upper()
 
     # 3) Known aliases (scan words)
-    for token in re.findall(r"[A-Za-z0-9\-\.\&']{2,20}", msg):
-        up = token.upper()
-        if up in _ALIASES:
-            return up
+    # ascii "replace" keeps indexes stable under upper() (non-ASCII -> "?", a word break)
+    up = msg.encode("ascii", "replace").decode("ascii").upper()
+    last = len(up) - 1
+    for end, (size, mapped) in _ALIAS_AUTOMATON.iter(up):
+        start = end - size + 1
+        if (start == 0 or up[start - 1] not in _WORD_CHARS) and (end == last or up[end + 1] not in _WORD_CHARS):
+            return mapped
 
     # 4) Uppercase-ish token that looks like a ticker (avoid stopwords)
-    for token in re.findall(r"[A-Za-z0-9]{1,6}", msg):
-        up = token.upper()
+    for m in _RE_TOK.finditer(msg):
+        up = m.group().upper()
         if up in _STOPWORDS:
             continue
-        if re.fullmatch(r"[A-Z0-9]{1,5}(?:-[A-Z]{1,2})?", up):
+        if _RE_VALID.fullmatch(up):
             return up
 
     return None
 
+_extract_first_ticker_cached = lru_cache(maxsize=4096)(_extract_first_ticker)
+
 # --------------------------------------------------------------------------------------
 # Core fetchers
 # --------------------------------------------------------------------------------------
 
+@cached(_QUOTE_CACHE, lock=_QUOTE_LOCK)
 def get_quote(ticker: str) -> Dict[str, Any]:
     t = yf.Ticker(ticker)
     info = t.fast_info
@@ -312,6 +402,7 @@ def get_quote(ticker: str) -> Dict[str, Any]:
 
     return out
 
+@_cached_unless_empty(_HISTORY_CACHE, _HISTORY_LOCK, _history_empty)
 def get_history_and_trends(ticker: str) -> Dict[str, Any]:
     t = yf.Ticker(ticker)
     try:
@@ -319,6 +410,9 @@ def get_history_and_trends(ticker: str) -> Dict[str, Any]:
     except Exception:
         return {"trend": {}, "samples": []}
 
+    return _history_payload(hist)
+
+def _history_payload(hist: Optional[pd.DataFrame]) -> Dict[str, Any]:
     if hist is None or hist.empty:
         return {"trend": {}, "samples": []}
 
@@ -329,26 +423,66 @@ def get_history_and_trends(ticker: str) -> Dict[str, Any]:
     except Exception:
         hist["Date"] = pd.to_datetime(hist["Date"]).dt.tz_convert(EU_TZ)
 
-    def pct_change(days: int) -> Optional[float]:
-        if len(hist) < days + 1:
-            return None
-        recent = float(hist.iloc[-1]["Close"])
-        past = float(hist.iloc[-1 - days]["Close"])
-        return _safe_pct(recent, past)
-
+    # All trend windows in one gather: close[-1] vs close[-1 - days]
+    closes = hist["Close"].to_numpy(dtype=np.float64)
+    n = closes.size
+    valid = _TREND_OFFSETS < n
+    past = np.zeros(_TREND_OFFSETS.size)
+    past[valid] = closes[n - 1 - _TREND_OFFSETS[valid]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (closes[-1] / past - 1.0) * 100.0
+    ok = valid & (past != 0)
     trend = {
-        "1d": pct_change(1),
-        "5d": pct_change(5),
-        "1mo": pct_change(21),
-        "3mo": pct_change(63),
-        "6mo": pct_change(126),
-        "1y": pct_change(252) if len(hist) >= 253 else None,
+        k: (float(p) if good else None)
+        for k, p, good in zip(_TREND_KEYS, pct.tolist(), ok.tolist())
     }
 
-    tail = hist.tail(60)[["Date", "Close"]]
-    samples = [{"t": int(row["Date"].timestamp()), "close": float(row["Close"])} for _, row in tail.iterrows()]
+    tail = hist.tail(60)
+    ts = pd.DatetimeIndex(tail["Date"]).as_unit("s").asi8   # epoch seconds
+    samples = [{"t": t, "close": c} for t, c in zip(ts.tolist(), tail["Close"].to_numpy(dtype=np.float64).tolist())]
     return {"trend": trend, "samples": samples}
 
+def get_history_and_trends_many(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Batch form of get_history_and_trends: one yf.download (parallel requests
+    inside yfinance) for every symbol not already cached. Results are stored
+    in the same cache the single-ticker function reads.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    with _HISTORY_LOCK:
+        for tk in dict.fromkeys(tickers):
+            hit = _HISTORY_CACHE.get(hashkey(tk))
+            if hit is None:
+                missing.append(tk)
+            else:
+                out[tk] = hit
+    if not missing:
+        return out
+
+    try:
+        df = yf.download(missing, period="1y", interval="1d", auto_adjust=False,
+                         group_by="ticker", threads=True, progress=False)
+    except Exception:
+        df = None
+
+    for tk in missing:
+        hist = None
+        if df is not None and not df.empty:
+            try:
+                hist = df[tk] if isinstance(df.columns, pd.MultiIndex) else df
+                hist = hist.dropna(subset=["Close"])
+            except KeyError:
+                hist = None
+        out[tk] = _history_payload(hist)
+        # Same rule as get_history_and_trends: yf.download reports failures
+        # as empty/NaN frames, which must not be cached
+        if not _history_empty(out[tk]):
+            with _HISTORY_LOCK:
+                _HISTORY_CACHE[hashkey(tk)] = out[tk]
+    return out
+
+@_cached_unless_empty(_NEWS_CACHE, _NEWS_LOCK, lambda items: not items)
 def get_news(ticker: str, limit: int = 6) -> List[Dict[str, Any]]:
     t = yf.Ticker(ticker)
     try:
@@ -367,8 +501,22 @@ def get_news(ticker: str, limit: int = 6) -> List[Dict[str, Any]]:
         })
     return items
 
+@cached(_SUMMARY_CACHE, lock=_SUMMARY_LOCK)
 def summarize_basic(ticker: str) -> Dict[str, Any]:
-    q = get_quote(ticker)          # enforces US-only and validity
-    h = get_history_and_trends(ticker)
-    n = get_news(ticker)
-    return {"quote": q, "history": h, "news": n}
+    fq = _FETCH_POOL.submit(get_quote, ticker)
+    fh = _FETCH_POOL.submit(get_history_and_trends, ticker)
+    fn = _FETCH_POOL.submit(get_news, ticker)
+    try:
+        q = fq.result()            # enforces US-only and validity
+    except Exception:
+        fh.cancel(); fn.cancel()
+        raise
+    return {"quote": q, "history": fh.result(), "news": fn.result()}
+
+def summarize_basic_many(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    """summarize_basic for several symbols, sharing one batched history download."""
+    hist = get_history_and_trends_many(tickers)
+    return {
+        tk: {"quote": get_quote(tk), "history": hist[tk], "news": get_news(tk)}
+        for tk in dict.fromkeys(tickers)
+    }
@@ -0,0 +1,43 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that sets Cache-Control.
+
+    Versioned URLs (``?v=<hash>``, see ``static_url``) are cached for a year;
+    anything else gets ``max_age`` seconds.
+    """
+
+    def __init__(self, *args, max_age: int = 300, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        resp = super().file_response(full_path, stat_result, scope, status_code)
+        qs = scope.get("query_string", b"")
+        if qs.startswith(b"v=") or b"&v=" in qs:
+            resp.headers["Cache-Control"] = IMMUTABLE
+        else:
+            resp.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        return resp
+
+
+@lru_cache(maxsize=256)
+def _digest(path: str, mtime_ns: int) -> str:
+    return hashlib.blake2b((STATIC_DIR / path).read_bytes(), digest_size=6).hexdigest()
+
+
+def static_url(path: str) -> str:
+    """/static URL with a content hash, so the browser can cache it forever."""
+    try:
+        mtime_ns = (STATIC_DIR / path).stat().st_mtime_ns
+    except OSError:
+        return f"/static/{path}"
+    return f"/static/{path}?v={_digest(path, mtime_ns)}"
@@ -0,0 +1,21 @@
+from pathlib import Path
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from . import config
+from .static_files import static_url
+
+# One shared environment so every router reuses the same compiled templates
+templates_dir = Path(__file__).resolve().parent / "templates"
+templates = Jinja2Templates(directory=str(templates_dir))
+
+# Skip the per-render mtime check outside of dev, and keep compiled
+# bytecode on disk so new workers don't re-parse every template.
+templates.env.auto_reload = config.DEBUG
+_bytecode_dir = config.PROJECT_ROOT / ".jinja_cache"
+_bytecode_dir.mkdir(exist_ok=True)
+templates.env.bytecode_cache = jinja2.FileSystemBytecodeCache(str(_bytecode_dir))
+
+# {{ static_url("styles.css") }} -> /static/styles.css?v=<content hash>
+templates.env.globals["static_url"] = static_url
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Request
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from pathlib import Path
 from typing import Optional, Dict, Any
+from cachetools import TTLCache, cached
 
-from ..auth.cognito_verify import verify_jwt  # type: ignore
-from ..auth.cognito_config import CLIENT_ID as AUDIENCE  # type: ignore
+from ..templates_env import templates
+from ..auth.session import optional_claims  # type: ignore
 
 # Dynamo is optional — import safely
 try:
@@ -15,21 +16,18 @@ except Exception:
     get_usage_today = None    # type: ignore
 
 router = APIRouter()
-templates_dir = Path(__file__).resolve().parents[1] / "templates"
-templates = Jinja2Templates(directory=str(templates_dir))
-
-def _get_claims(request: Request) -> Optional[Dict[str, Any]]:
-    token = request.cookies.get("id_token")
-    if not token:
-        return None
-    try:
-        return verify_jwt(token, audience=AUDIENCE)
-    except Exception:
-        return None
+
+# Runs list and usage count are independent queries: run them side by side
+_EXE = ThreadPoolExecutor(max_workers=8, thread_name_prefix="home")
+_DASHBOARD_TIMEOUT = 2  # seconds per query before the page renders without it
+
+# The dashboard counter doesn't need to be fresher than this
+@cached(TTLCache(maxsize=10_000, ttl=30), lock=threading.Lock())
+def _usage_cached(sub: str) -> Dict[str, Any]:
+    return get_usage_today(sub)  # type: ignore
 
 @router.get("/", response_class=HTMLResponse)
-def home(request: Request):
-    claims = _get_claims(request)
+def home(request: Request, claims: Optional[Dict[str, Any]] = Depends(optional_claims)):
     user_email = claims.get("email") if claims else None
 
     recent_runs = None
@@ -37,8 +35,10 @@ def home(request: Request):
     if claims and list_recent_runs and get_usage_today:
         try:
             sub = claims.get("sub")
-            recent_runs = list_recent_runs(sub, limit=5)  # type: ignore
-            usage = get_usage_today(sub)                  # type: ignore
+            f_runs = _EXE.submit(list_recent_runs, sub, 5)  # type: ignore
+            f_usage = _EXE.submit(_usage_cached, sub)
+            recent_runs = f_runs.result(timeout=_DASHBOARD_TIMEOUT)
+            usage = f_usage.result(timeout=_DASHBOARD_TIMEOUT)
         except Exception:
             recent_runs, usage = [], {"runs_today": 0}
 